@@ -9,12 +9,80 @@ import seaborn as sns
 from typing import List, Dict, Optional, Tuple
 from scipy import stats
 
+from data_processing.cleaner import ReservoirDataCleaner
+from data_processing.columns import date_part
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; kernels fall back to NumPy
+    njit = None
+
+
+def _mann_kendall_s_kernel(values: np.ndarray) -> int:
+    """Count concordant minus discordant pairs (j > i) in a 1-D array."""
+    n = values.size
+    s = 0
+    for i in prange(n - 1):
+        acc = 0
+        for j in range(i + 1, n):
+            acc += (values[j] > values[i]) - (values[j] < values[i])
+        s += acc
+    return s
+
+
+def _masked_bincount_kernel(keys: np.ndarray, mask: np.ndarray, size: int) -> np.ndarray:
+    """Count occurrences of each non-negative key where mask is True."""
+    out = np.zeros(size, np.int64)
+    for i in range(keys.size):
+        if mask[i]:
+            out[keys[i]] += 1
+    return out
+
+
+if njit is not None:
+    _mann_kendall_s_kernel = njit(parallel=True, cache=True)(_mann_kendall_s_kernel)
+    _masked_bincount_kernel = njit(cache=True)(_masked_bincount_kernel)
+
+
+def pearson_matrix(values: np.ndarray, zero_variance_rtol: float = 1e-12) -> np.ndarray:
+    """
+    Pearson correlation matrix of the columns of a dense 2-D array without NaNs.
+    
+    Columns are centered and scaled in float64, which keeps the signal of columns
+    with a large offset, and then correlated with one float32 matrix product.
+    
+    Args:
+        values: 2-D array with observations in rows, at least two rows
+        zero_variance_rtol: Columns whose standard deviation is at most this
+            fraction of their absolute mean count as constant
+            
+    Returns:
+        Correlation matrix, NaN in the rows and columns of constant columns
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    mean = values.mean(axis=0)
+    centered = values - mean
+    std = np.sqrt(np.einsum('ij,ij->j', centered, centered) / (n - 1))
+    # A spread at rounding level around the mean is a constant column
+    std[std <= zero_variance_rtol * np.abs(mean)] = np.nan
+    
+    standardized = (centered / std).astype(np.float32)
+    corr = (standardized.T @ standardized).astype(np.float64) / (n - 1)
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return corr
+
 
 class ExploratoryAnalyzer:
     """
     Utility class for performing exploratory data analysis on reservoir weather data.
     """
     
+    # Largest series for which the Mann-Kendall S statistic is computed from
+    # the full pairwise difference matrix; longer series use a rank-based method
+    MK_PAIRWISE_MAX_N = 2000
+    
     def __init__(self, data: pd.DataFrame):
         """
         Initialize the analyzer with data.
@@ -23,7 +91,13 @@ class ExploratoryAnalyzer:
             data: DataFrame containing reservoir and weather data
         """
         self.data = data.copy()
-        self.reservoirs = data['embalse_nombre'].unique() if 'embalse_nombre' in data.columns else []
+        if 'embalse_nombre' in self.data.columns:
+            # Categorical codes make reservoir filters and groupbys integer operations
+            if not isinstance(self.data['embalse_nombre'].dtype, pd.CategoricalDtype):
+                self.data['embalse_nombre'] = self.data['embalse_nombre'].astype('category')
+            self.reservoirs = np.asarray(self.data['embalse_nombre'].unique())
+        else:
+            self.reservoirs = []
         
     def seasonal_analysis(self, variable: str, reservoir: Optional[str] = None) -> Dict[str, pd.DataFrame]:
         """
@@ -36,34 +110,34 @@ class ExploratoryAnalyzer:
         Returns:
             Dictionary containing seasonal statistics
         """
-        df = self.data.copy()
+        df = self.data
         
         if reservoir:
             df = df[df['embalse_nombre'] == reservoir]
         
-        # Add temporal features if not present
-        if 'month' not in df.columns:
-            df['month'] = df['date'].dt.month
-        if 'season' not in df.columns:
-            df['season'] = df['month'].map({
-                12: 'Winter', 1: 'Winter', 2: 'Winter',
-                3: 'Spring', 4: 'Spring', 5: 'Spring',
-                6: 'Summer', 7: 'Summer', 8: 'Summer',
-                9: 'Autumn', 10: 'Autumn', 11: 'Autumn'
-            })
+        # Temporal keys as standalone Series, reusing precomputed columns if present
+        months = date_part(df, 'month')
+        if 'season' in df.columns:
+            seasons = df['season']
+        else:
+            seasons = pd.Series(ReservoirDataCleaner.seasons_for_months(months),
+                                index=df.index, name='season')
+        values = df[variable]
         
         results = {}
         
         # Monthly statistics
-        monthly_stats = df.groupby('month')[variable].agg(['mean', 'std', 'min', 'max', 'count'])
+        monthly_stats = values.groupby(months).agg(['mean', 'std', 'min', 'max', 'count'])
         results['monthly'] = monthly_stats
         
         # Seasonal statistics
-        seasonal_stats = df.groupby('season')[variable].agg(['mean', 'std', 'min', 'max', 'count'])
+        seasonal_stats = values.groupby(seasons, observed=True).agg(['mean', 'std', 'min', 'max', 'count'])
         results['seasonal'] = seasonal_stats
         
         # Year-over-year comparison
-        yearly_seasonal = df.groupby([df['date'].dt.year, 'season'])[variable].mean().unstack()
+        yearly_seasonal = values.groupby(
+            [date_part(df, 'year'), seasons], observed=True
+        ).mean().unstack()
         results['yearly_seasonal'] = yearly_seasonal
         
         return results
@@ -79,18 +153,25 @@ class ExploratoryAnalyzer:
         Returns:
             Dictionary containing trend analysis results
         """
-        df = self.data.copy()
-        df = df.sort_values('date')
-        
-        # Create time index for regression
-        df['time_index'] = (df['date'] - df['date'].min()).dt.days
+        # Date order and time index as plain arrays instead of a sorted copy
+        # (rows without a date have no place in time and are left out)
+        dates = self.data['date']
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert(None)
+        dated = np.flatnonzero(dates.notna().to_numpy())
+        dates = dates.to_numpy()
+        order = dated[np.argsort(dates[dated], kind='stable')]
+        sorted_dates = dates[order]
+        time_index = (sorted_dates - sorted_dates[:1]) // np.timedelta64(1, 'D')
+        series = self.data[variable].to_numpy(dtype=np.float64)[order]
+        valid = ~np.isnan(series)
         
         results = {}
         
         if method == 'linear':
             # Linear regression
             slope, intercept, r_value, p_value, std_err = stats.linregress(
-                df['time_index'], df[variable].dropna()
+                time_index[valid], series[valid]
             )
             
             results['slope'] = slope
@@ -104,17 +185,17 @@ class ExploratoryAnalyzer:
             
         elif method == 'mann_kendall':
             # Mann-Kendall trend test (simplified version)
-            values = df[variable].dropna().values
+            values = series[valid]
             n = len(values)
             
             # Calculate S statistic
-            S = 0
-            for i in range(n-1):
-                for j in range(i+1, n):
-                    S += np.sign(values[j] - values[i])
+            S = self._mann_kendall_s(values)
             
-            # Variance calculation (simplified)
-            var_s = n * (n-1) * (2*n+5) / 18
+            # Variance calculation with tie correction
+            _, tie_counts = np.unique(values, return_counts=True)
+            tie_counts = tie_counts[tie_counts > 1]
+            var_s = (n * (n-1) * (2*n+5)
+                     - np.sum(tie_counts * (tie_counts-1) * (2*tie_counts+5))) / 18
             
             # Z statistic
             if S > 0:
@@ -134,34 +215,156 @@ class ExploratoryAnalyzer:
         
         return results
     
-    def reservoir_comparison(self, variables: List[str]) -> pd.DataFrame:
+    @staticmethod
+    def _grouped_mean(keys: np.ndarray, values: np.ndarray, key_name: str, name: str) -> pd.Series:
         """
-        Compare statistics across reservoirs for multiple variables.
+        Compute NaN-skipping means of values grouped by small integer keys.
+        
+        Equivalent to a groupby mean, using two bincount passes instead.
         
         Args:
-            variables: List of variables to compare
+            keys: Integer group keys (NaN keys, from missing dates, are skipped)
+            values: Float values aligned with keys
+            key_name: Name for the resulting index
+            name: Name for the resulting Series
             
         Returns:
-            DataFrame with comparison statistics
+            Series of means indexed by the sorted unique keys
+        """
+        keys = np.asarray(keys, dtype=np.float64)
+        known = ~np.isnan(keys)
+        keys = keys[known].astype(np.int64)
+        values = values[known]
+        if keys.size == 0:
+            return pd.Series(dtype=np.float64, index=pd.Index([], name=key_name), name=name)
+        
+        offset = keys.min()
+        shifted = keys - offset
+        valid = ~np.isnan(values)
+        
+        present = np.bincount(shifted) > 0
+        sums = np.bincount(shifted[valid], weights=values[valid], minlength=present.size)
+        counts = np.bincount(shifted[valid], minlength=present.size)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums[present] / counts[present]
+        index = pd.Index(np.flatnonzero(present) + offset, name=key_name)
+        return pd.Series(means, index=index, name=name)
+    
+    @staticmethod
+    def _quantile(values: np.ndarray, q: float) -> float:
+        """
+        Compute a linearly interpolated quantile, ignoring NaN values.
+        
+        Matches Series.quantile, using a partial sort (np.partition) in O(n)
+        instead of a full sort.
+        
+        Args:
+            values: 1-D float array
+            q: Quantile in [0, 1]
+            
+        Returns:
+            Quantile value (NaN if there are no valid values)
+        """
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return np.nan
+        
+        position = (values.size - 1) * q
+        lower = int(np.floor(position))
+        upper = min(lower + 1, values.size - 1)
+        partitioned = np.partition(values, [lower, upper])
+        fraction = position - lower
+        return float(partitioned[lower] + (partitioned[upper] - partitioned[lower]) * fraction)
+    
+    @staticmethod
+    def _count_by_key(keys: np.ndarray, mask: np.ndarray, key_name: str) -> pd.Series:
         """
-        comparison_data = []
+        Count masked rows per integer key.
+        
+        Equivalent to grouping the masked rows by key and taking the group sizes.
         
-        for reservoir in self.reservoirs:
-            reservoir_data = self.data[self.data['embalse_nombre'] == reservoir]
+        Args:
+            keys: Integer group keys (NaN keys, from missing dates, are skipped)
+            mask: Boolean mask selecting the rows to count
+            key_name: Name for the resulting index
             
-            row = {'reservoir': reservoir}
+        Returns:
+            Series of counts indexed by the sorted keys that occur in masked rows
+        """
+        keys = np.asarray(keys, dtype=np.float64)
+        mask = mask & ~np.isnan(keys)
+        if not mask.any():
+            return pd.Series(dtype=np.int64, index=pd.Index([], dtype=np.int64, name=key_name))
+        
+        keys = np.where(mask, keys, 0).astype(np.int64)
+        offset = keys[mask].min()
+        shifted = np.where(mask, keys - offset, 0)
+        size = int(shifted.max()) + 1
+        if njit is not None:
+            counts = _masked_bincount_kernel(shifted, mask, size)
+        else:
+            counts = np.bincount(shifted[mask], minlength=size)
+        
+        present = np.flatnonzero(counts)
+        return pd.Series(counts[present], index=pd.Index(present + offset, name=key_name))
+    
+    @staticmethod
+    def _mann_kendall_s(values: np.ndarray) -> int:
+        """
+        Compute the Mann-Kendall S statistic (concordant minus discordant pairs).
+        
+        Args:
+            values: 1-D array of observations in time order
             
-            for var in variables:
-                if var in reservoir_data.columns:
-                    row[f'{var}_mean'] = reservoir_data[var].mean()
-                    row[f'{var}_std'] = reservoir_data[var].std()
-                    row[f'{var}_min'] = reservoir_data[var].min()
-                    row[f'{var}_max'] = reservoir_data[var].max()
-                    row[f'{var}_count'] = reservoir_data[var].count()
+        Returns:
+            S statistic as an integer
+        """
+        n = len(values)
+        if n < 2:
+            return 0
+        
+        if n <= ExploratoryAnalyzer.MK_PAIRWISE_MAX_N:
+            if njit is not None:
+                return int(_mann_kendall_s_kernel(np.ascontiguousarray(values)))
             
-            comparison_data.append(row)
+            # diff[i, j] = values[j] - values[i]; keep the upper triangle (j > i)
+            diff = values[None, :] - values[:, None]
+            return int(np.sign(diff[np.triu_indices(n, k=1)]).sum())
+        
+        # O(n log n) path: against a strictly increasing time index,
+        # Kendall's tau-b numerator equals S
+        tau, _ = stats.kendalltau(np.arange(n), values)
+        if np.isnan(tau):
+            return 0
+        n_pairs = n * (n-1) / 2
+        _, tie_counts = np.unique(values, return_counts=True)
+        tied_pairs = np.sum(tie_counts * (tie_counts-1) / 2)
+        return int(round(tau * np.sqrt(n_pairs * (n_pairs - tied_pairs))))
+    
+    def reservoir_comparison(self, variables: List[str]) -> pd.DataFrame:
+        """
+        Compare statistics across reservoirs for multiple variables.
         
-        return pd.DataFrame(comparison_data)
+        Args:
+            variables: List of variables to compare
+            
+        Returns:
+            DataFrame with comparison statistics
+        """
+        variables = [var for var in variables if var in self.data.columns]
+        if len(self.reservoirs) == 0:
+            return pd.DataFrame()
+        if not variables:
+            return pd.DataFrame({'reservoir': self.reservoirs})
+        
+        # Single grouped pass over the data instead of one mask per reservoir
+        comparison = self.data.groupby('embalse_nombre', sort=False, observed=True)[variables].agg(
+            ['mean', 'std', 'min', 'max', 'count']
+        )
+        comparison.columns = [f'{var}_{stat}' for var, stat in comparison.columns]
+        
+        return comparison.reset_index().rename(columns={'embalse_nombre': 'reservoir'})
     
     def extreme_events_analysis(self, variable: str, threshold_percentile: float = 95) -> Dict[str, any]:
         """
@@ -174,21 +377,27 @@ class ExploratoryAnalyzer:
         Returns:
             Dictionary containing extreme events analysis
         """
-        df = self.data.copy()
+        df = self.data
         
         # Calculate threshold
-        threshold = df[variable].quantile(threshold_percentile / 100)
+        values = df[variable].to_numpy(dtype=np.float64)
+        threshold = self._quantile(values, threshold_percentile / 100)
         
         # Identify extreme events
-        extreme_events = df[df[variable] > threshold]
+        mask = values > threshold
+        extreme_events = df[mask]
         
         results = {
             'threshold': threshold,
             'num_extreme_events': len(extreme_events),
             'extreme_percentage': (len(extreme_events) / len(df)) * 100,
             'extreme_events_data': extreme_events,
-            'monthly_extreme_counts': extreme_events.groupby(extreme_events['date'].dt.month).size(),
-            'yearly_extreme_counts': extreme_events.groupby(extreme_events['date'].dt.year).size()
+            'monthly_extreme_counts': self._count_by_key(
+                date_part(df, 'month').to_numpy(dtype=np.float64, na_value=np.nan), mask, 'month'
+            ),
+            'yearly_extreme_counts': self._count_by_key(
+                date_part(df, 'year').to_numpy(dtype=np.float64, na_value=np.nan), mask, 'year'
+            )
         }
         
         # Statistics of extreme events
@@ -214,9 +423,13 @@ class ExploratoryAnalyzer:
         if variables is None:
             variables = self.data.select_dtypes(include=[np.number]).columns.tolist()
         
-        correlation_matrix = self.data[variables].corr(method=method)
+        block = self.data[variables]
+        if method != 'pearson' or len(block) < 2 or block.isna().to_numpy().any():
+            # Rank methods and pairwise NaN handling need the pandas implementation
+            return block.corr(method=method)
         
-        return correlation_matrix
+        corr = pearson_matrix(block.to_numpy(dtype=np.float64))
+        return pd.DataFrame(corr, index=variables, columns=variables)
     
     def temporal_patterns(self, variable: str) -> Dict[str, pd.Series]:
         """
@@ -228,22 +441,22 @@ class ExploratoryAnalyzer:
         Returns:
             Dictionary containing various temporal patterns
         """
-        df = self.data.copy()
-        df = df.sort_values('date')
+        values = self.data[variable].to_numpy(dtype=np.float64)
         
         patterns = {}
         
         # Daily patterns (day of week)
-        patterns['day_of_week'] = df.groupby(df['date'].dt.dayofweek)[variable].mean()
-        
-        # Monthly patterns
-        patterns['monthly'] = df.groupby(df['date'].dt.month)[variable].mean()
-        
-        # Yearly patterns
-        patterns['yearly'] = df.groupby(df['date'].dt.year)[variable].mean()
-        
-        # Day of year patterns
-        patterns['day_of_year'] = df.groupby(df['date'].dt.dayofyear)[variable].mean()
+        patterns['day_of_week'] = self._grouped_mean(
+            self.data['date'].dt.dayofweek.to_numpy(dtype=np.float64, na_value=np.nan),
+            values, 'day_of_week', variable
+        )
+        
+        # Monthly, yearly and day of year patterns
+        for key, part in [('monthly', 'month'), ('yearly', 'year'), ('day_of_year', 'day_of_year')]:
+            patterns[key] = self._grouped_mean(
+                date_part(self.data, part).to_numpy(dtype=np.float64, na_value=np.nan),
+                values, part, variable
+            )
         
         return patterns
     
@@ -257,21 +470,23 @@ class ExploratoryAnalyzer:
         report = []
         report.append("=== EXPLORATORY DATA ANALYSIS SUMMARY ===\n")
         
+        nums = self.data.select_dtypes(include=[np.number])
+        
         # Basic information
+        date_range = self.data['date'].agg(['min', 'max'])
         report.append(f"Dataset Shape: {self.data.shape}")
-        report.append(f"Date Range: {self.data['date'].min()} to {self.data['date'].max()}")
+        report.append(f"Date Range: {date_range['min']} to {date_range['max']}")
         report.append(f"Number of Reservoirs: {len(self.reservoirs)}")
         report.append(f"Reservoirs: {', '.join(self.reservoirs)}\n")
         
         # Variable summary
-        numeric_vars = self.data.select_dtypes(include=[np.number]).columns
-        report.append(f"Numeric Variables ({len(numeric_vars)}):")
-        for var in numeric_vars:
+        report.append(f"Numeric Variables ({len(nums.columns)}):")
+        for var in nums.columns:
             report.append(f"  - {var}")
         report.append("")
         
-        # Missing data summary
-        missing_data = self.data.isnull().sum()
+        # Missing data summary (numeric measurements only)
+        missing_data = nums.isna().sum()
         missing_vars = missing_data[missing_data > 0]
         if len(missing_vars) > 0:
             report.append("Missing Data:")
@@ -284,11 +499,11 @@ class ExploratoryAnalyzer:
         
         # Basic statistics for key variables
         key_vars = ['embalse_porcentaje', 'meteo_temp_media', 'meteo_precipitacion']
-        key_vars = [var for var in key_vars if var in self.data.columns]
+        key_vars = [var for var in key_vars if var in nums.columns]
         
         if key_vars:
             report.append("Key Variable Statistics:")
-            stats_df = self.data[key_vars].describe()
+            stats_df = nums[key_vars].describe()
             report.append(stats_df.to_string())
             report.append("")
         
@@ -6,12 +6,27 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Optional
 
+from .columns import DATE_PARTS, compute_date_part
+
 
 class ReservoirDataCleaner:
     """
     Utility class for cleaning and preprocessing reservoir weather data.
     """
     
+    # Season categories and a month-indexed lookup of their codes (index 0 unused)
+    SEASONS = ['Winter', 'Spring', 'Summer', 'Autumn']
+    SEASON_CODES = np.array([-1, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0], dtype=np.int8)
+    
+    # Rounding precision (decimal places) for each numeric column
+    DECIMALS = {
+        'embalse_reserva': 3, 'embalse_porcentaje': 1,
+        'meteo_temp_max': 2, 'meteo_temp_min': 2, 'meteo_temp_media': 2,
+        'meteo_humedad_max': 1, 'meteo_humedad_min': 1, 'meteo_humedad_media': 1,
+        'meteo_vel_viento': 2, 'meteo_vel_viento_max': 2, 'meteo_dir_viento': 2,
+        'meteo_radiacion': 2, 'meteo_precipitacion': 2
+    }
+    
     @staticmethod
     def clean_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -23,35 +38,18 @@ class ReservoirDataCleaner:
         Returns:
             DataFrame with cleaned numeric columns
         """
-        df_clean = df.copy()
-        
-        # Define numeric columns
-        numeric_columns = [
-            'embalse_reserva', 'embalse_porcentaje',
-            'meteo_temp_max', 'meteo_temp_min', 'meteo_temp_media',
-            'meteo_humedad_max', 'meteo_humedad_min', 'meteo_humedad_media',
-            'meteo_vel_viento', 'meteo_vel_viento_max', 'meteo_dir_viento',
-            'meteo_radiacion', 'meteo_precipitacion'
-        ]
-        
-        # Round to reasonable precision to fix floating point issues
-        for col in numeric_columns:
-            if col in df_clean.columns:
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-                if col in ['embalse_reserva']:
-                    df_clean[col] = df_clean[col].round(3)
-                elif col in ['embalse_porcentaje']:
-                    df_clean[col] = df_clean[col].round(1)
-                elif 'temp' in col:
-                    df_clean[col] = df_clean[col].round(2)
-                elif 'humedad' in col:
-                    df_clean[col] = df_clean[col].round(1)
-                elif 'viento' in col or 'dir_viento' in col:
-                    df_clean[col] = df_clean[col].round(2)
-                elif col in ['meteo_radiacion', 'meteo_precipitacion']:
-                    df_clean[col] = df_clean[col].round(2)
-        
-        return df_clean
+        cleaned = {}
+        for col, decimals in ReservoirDataCleaner.DECIMALS.items():
+            if col in df.columns:
+                values = df[col]
+                # Coerce only the columns that are not numeric already
+                if not pd.api.types.is_numeric_dtype(values):
+                    values = pd.to_numeric(values, errors='coerce')
+                # Round to reasonable precision to fix floating point issues
+                cleaned[col] = values.round(decimals)
+        
+        # A single assign builds the result without copying the other columns
+        return df.assign(**cleaned)
     
     @staticmethod
     def validate_ranges(df: pd.DataFrame) -> pd.DataFrame:
@@ -82,12 +80,17 @@ class ReservoirDataCleaner:
             'meteo_precipitacion': (0, 200)
         }
         
-        # Flag values outside reasonable ranges
-        for col, (min_val, max_val) in ranges.items():
-            if col in df_validated.columns:
-                mask = (df_validated[col] < min_val) | (df_validated[col] > max_val)
-                if mask.any():
-                    print(f"Warning: {mask.sum()} values in {col} outside range [{min_val}, {max_val}]")
+        # Flag values outside reasonable ranges, checking all columns in one block
+        cols = [col for col in ranges if col in df_validated.columns]
+        if cols:
+            lower = np.array([ranges[col][0] for col in cols], dtype=np.float64)
+            upper = np.array([ranges[col][1] for col in cols], dtype=np.float64)
+            block = df_validated[cols].to_numpy(dtype=np.float64)
+            counts = ((block < lower) | (block > upper)).sum(axis=0)
+            for col, count in zip(cols, counts):
+                if count:
+                    min_val, max_val = ranges[col]
+                    print(f"Warning: {count} values in {col} outside range [{min_val}, {max_val}]")
         
         return df_validated
     
@@ -107,15 +110,37 @@ class ReservoirDataCleaner:
         df_filled = df.copy()
         
         numeric_columns = df_filled.select_dtypes(include=[np.number]).columns
+        if len(numeric_columns) == 0:
+            return df_filled
         
         if strategy == 'interpolate':
-            # Use time-based interpolation for numeric columns
-            for col in numeric_columns:
-                df_filled[col] = df_filled[col].interpolate(method='time')
+            # Time-based interpolation within each reservoir, in date order
+            dates = df_filled.index
+            if not isinstance(dates, pd.DatetimeIndex):
+                dates = pd.DatetimeIndex(df_filled['date'])
+            if 'embalse_codigo' in df_filled.columns:
+                codes, _ = pd.factorize(df_filled['embalse_codigo'])
+            else:
+                codes = np.zeros(len(df_filled), dtype=np.int64)
+            
+            # Rows without a date have no place in time and are left unchanged
+            dated = np.flatnonzero(dates.notna())
+            if dated.size == 0:
+                return df_filled
+            order = dated[np.lexsort((dates.asi8[dated], codes[dated]))]
+            
+            block = df_filled[numeric_columns].set_axis(dates).iloc[order]
+            filled = block.groupby(codes[order], sort=False).transform(
+                lambda group: group.interpolate(method='time')
+            ).set_axis(order)
+            if order.size < len(df_filled):
+                undated = np.flatnonzero(dates.isna())
+                filled = pd.concat([filled, df_filled[numeric_columns].iloc[undated].set_axis(undated)])
+            df_filled[numeric_columns] = filled.sort_index().set_axis(df_filled.index)
         elif strategy == 'forward_fill':
-            df_filled[numeric_columns] = df_filled[numeric_columns].fillna(method='ffill')
+            df_filled[numeric_columns] = df_filled[numeric_columns].ffill()
         elif strategy == 'drop':
-            df_filled = df_filled.dropna()
+            df_filled = df_filled.dropna(subset=numeric_columns)
         
         return df_filled
     
@@ -132,16 +157,11 @@ class ReservoirDataCleaner:
         """
         df_enhanced = df.copy()
         
-        # Time-based features
-        df_enhanced['year'] = df_enhanced['date'].dt.year
-        df_enhanced['month'] = df_enhanced['date'].dt.month
-        df_enhanced['day_of_year'] = df_enhanced['date'].dt.dayofyear
-        df_enhanced['season'] = df_enhanced['month'].map({
-            12: 'Winter', 1: 'Winter', 2: 'Winter',
-            3: 'Spring', 4: 'Spring', 5: 'Spring',
-            6: 'Summer', 7: 'Summer', 8: 'Summer',
-            9: 'Autumn', 10: 'Autumn', 11: 'Autumn'
-        })
+        # Time-based features (stored as int16 so later analyses can reuse them;
+        # nullable Int16 when some dates are missing)
+        for part in DATE_PARTS:
+            df_enhanced[part] = compute_date_part(df_enhanced['date'], part)
+        df_enhanced['season'] = ReservoirDataCleaner.seasons_for_months(df_enhanced['month'])
         
         # Weather-derived features
         if all(col in df_enhanced.columns for col in ['meteo_temp_max', 'meteo_temp_min']):
@@ -160,11 +180,49 @@ class ReservoirDataCleaner:
         
         # Reservoir change indicators
         df_enhanced = df_enhanced.sort_values(['embalse_codigo', 'date'])
-        df_enhanced['reservoir_change'] = df_enhanced.groupby('embalse_codigo')['embalse_porcentaje'].diff()
-        df_enhanced['reservoir_change_7d'] = df_enhanced.groupby('embalse_codigo')['embalse_porcentaje'].diff(7)
+        # After sorting each reservoir is contiguous, so diff the whole column
+        # and blank out differences that cross a reservoir boundary
+        groups, _ = pd.factorize(df_enhanced['embalse_codigo'])
+        levels = df_enhanced['embalse_porcentaje'].to_numpy(dtype=np.float64)
+        df_enhanced['reservoir_change'] = ReservoirDataCleaner._grouped_diff(levels, groups, 1)
+        df_enhanced['reservoir_change_7d'] = ReservoirDataCleaner._grouped_diff(levels, groups, 7)
         
         return df_enhanced
     
+    @staticmethod
+    def seasons_for_months(months: pd.Series) -> pd.Categorical:
+        """
+        Map month numbers to season categories.
+        
+        Args:
+            months: Month numbers (1-12), possibly with missing values
+            
+        Returns:
+            Categorical of seasons, missing where the month is missing
+        """
+        # Missing months map to lookup index 0, whose code -1 gives a missing season
+        codes = np.take(ReservoirDataCleaner.SEASON_CODES, months.to_numpy(dtype=np.int64, na_value=0))
+        return pd.Categorical.from_codes(codes, categories=ReservoirDataCleaner.SEASONS)
+    
+    @staticmethod
+    def _grouped_diff(values: np.ndarray, groups: np.ndarray, periods: int) -> np.ndarray:
+        """
+        Compute lagged differences within contiguous groups.
+        
+        Args:
+            values: Values sorted so that each group is contiguous
+            groups: Group labels aligned with values
+            periods: Lag in rows
+            
+        Returns:
+            Array of differences, NaN where the lagged row is in another group
+        """
+        diff = np.full(values.shape, np.nan)
+        if len(values) > periods:
+            diff[periods:] = values[periods:] - values[:-periods]
+            diff[periods:][groups[periods:] != groups[:-periods]] = np.nan
+        return diff
+    
     @staticmethod
     def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
         """
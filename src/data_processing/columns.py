@@ -0,0 +1,68 @@
+"""
+Column conventions shared across the data processing, analysis and plotting modules.
+"""
+
+import pandas as pd
+
+
+# Repeated string columns stored, compared and grouped as categoricals
+CATEGORICAL_COLUMNS = ['embalse_codigo', 'embalse_nombre', 'embalse_provincia']
+
+
+def with_categorical_names(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return df with its string reservoir columns converted to categoricals.
+    
+    Categories absent from df (e.g. after filtering a subset) are dropped,
+    so groupbys and plots only see the reservoirs present in df.
+    
+    Args:
+        df: Input DataFrame
+        
+    Returns:
+        DataFrame with categorical reservoir columns (df itself if none change)
+    """
+    converted = {}
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            converted[col] = df[col].cat.remove_unused_categories()
+        elif pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            converted[col] = df[col].astype('category')
+    return df.assign(**converted) if converted else df
+
+
+# Derived date-part columns (as added by ReservoirDataCleaner) and their accessors
+DATE_PARTS = {'year': 'year', 'month': 'month', 'day_of_year': 'dayofyear'}
+
+
+def compute_date_part(dates: pd.Series, part: str) -> pd.Series:
+    """
+    Compute a date part as int16 (nullable Int16 if any date is missing).
+    
+    Args:
+        dates: Datetime Series (naive or timezone-aware)
+        part: Date part name ('year', 'month', 'day_of_year')
+        
+    Returns:
+        Series named after the date part
+    """
+    part_dtype = 'Int16' if dates.hasnans else 'int16'
+    return getattr(dates.dt, DATE_PARTS[part]).astype(part_dtype).rename(part)
+
+
+def date_part(df: pd.DataFrame, part: str) -> pd.Series:
+    """
+    Get a date part, reusing the precomputed column when available.
+    
+    Args:
+        df: DataFrame with a 'date' column
+        part: Date part column name ('year', 'month', 'day_of_year')
+        
+    Returns:
+        Series with the requested date part
+    """
+    if part in df.columns:
+        return df[part]
+    return compute_date_part(df['date'], part)
@@ -3,25 +3,54 @@ Data loading utilities for reservoir and weather data.
 """
 
 import pandas as pd
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional, Union
 
+from .columns import CATEGORICAL_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to the pandas CSV parser
+    pa = None
+
 
 class ReservoirDataLoader:
     """
     Utility class for loading reservoir and weather data from CSV files.
     """
     
-    def __init__(self, data_path: str = "data/reservoir-weather"):
+    # Repeated string columns stored as categoricals
+    CATEGORICAL_COLUMNS = CATEGORICAL_COLUMNS
+    
+    # Single Parquet file holding all reservoirs, written by build_cache()
+    MASTER_CACHE_FILE = 'master.parquet'
+    
+    # Column in the master cache recording each row's source file stem
+    SOURCE_COLUMN = 'source_file'
+    
+    # Parquet metadata key listing the reservoirs stored in the master cache
+    MASTER_RESERVOIRS_KEY = b'reservoirs'
+    
+    def __init__(self, data_path: str = "data/reservoir-weather", use_parquet_cache: bool = False):
         """
         Initialize the data loader.
         
         Args:
             data_path: Path to the data directory
+            use_parquet_cache: Write a Parquet copy beside each parsed CSV file and
+                read it instead of the CSV while it is newer (requires pyarrow)
         """
         self.data_path = Path(data_path)
+        self.use_parquet_cache = use_parquet_cache and pa is not None
         self.reservoirs = self._get_available_reservoirs()
+        self._raw_cache: Dict[str, pd.DataFrame] = {}
+        self._combined: Optional[pd.DataFrame] = None
+        self._master_fresh: Optional[bool] = None
     
     def _get_available_reservoirs(self) -> List[str]:
         """Get list of available reservoir names from CSV files."""
@@ -40,14 +69,136 @@ class ReservoirDataLoader:
         Returns:
             DataFrame with reservoir and weather data
         """
-        file_path = self.data_path / f"{reservoir_name}.csv"
-        if not file_path.exists():
-            raise FileNotFoundError(f"Data file not found: {file_path}")
+        return self._load_raw(reservoir_name).copy()
+    
+    def _load_raw(self, reservoir_name: str) -> pd.DataFrame:
+        """
+        Parse a reservoir CSV file once and cache the result.
+        
+        The cached DataFrame is shared, so callers must not modify it.
+        """
+        if reservoir_name not in self._raw_cache:
+            file_path = self.data_path / f"{reservoir_name}.csv"
+            if not file_path.exists():
+                raise FileNotFoundError(f"Data file not found: {file_path}")
+            self._raw_cache[reservoir_name] = self._read_cached(file_path)
+        return self._raw_cache[reservoir_name]
+    
+    def _read_cached(self, file_path: Path) -> pd.DataFrame:
+        """Read a reservoir file, going through a Parquet cache when available."""
+        if self._master_cache_is_fresh():
+            df = self._read_master(filters=[(self.SOURCE_COLUMN, '==', file_path.stem)])
+            if not df.empty:
+                for col in self.CATEGORICAL_COLUMNS:
+                    if col in df.columns:
+                        df[col] = df[col].cat.remove_unused_categories()
+                return df
+        
+        if not self.use_parquet_cache:
+            return self._read_csv(file_path)
+        
+        parquet_path = file_path.with_suffix('.parquet')
+        if parquet_path.exists() and parquet_path.stat().st_mtime >= file_path.stat().st_mtime:
+            return pd.read_parquet(parquet_path, engine='pyarrow')
         
-        df = pd.read_csv(file_path)
+        df = self._read_csv(file_path)
+        try:
+            df.to_parquet(parquet_path, engine='pyarrow', index=False)
+        except OSError as e:
+            print(f"Warning: could not write Parquet cache {parquet_path}: {e}")
+        return df
+    
+    def _read_csv(self, file_path: Path) -> pd.DataFrame:
+        """Read a reservoir CSV file with parsed dates and categorical name columns."""
+        if pa is not None:
+            column_types = {'date': pa.timestamp('ns')}
+            column_types.update({
+                col: pa.dictionary(pa.int32(), pa.string()) for col in self.CATEGORICAL_COLUMNS
+            })
+            table = pa_csv.read_csv(
+                file_path,
+                convert_options=pa_csv.ConvertOptions(column_types=column_types)
+            )
+            return table.to_pandas()
+        
+        dtypes = {col: 'category' for col in self.CATEGORICAL_COLUMNS}
+        df = pd.read_csv(file_path, dtype=dtypes)
         df['date'] = pd.to_datetime(df['date'])
         return df
     
+    def build_cache(self) -> Path:
+        """
+        Write all reservoirs to a single ZSTD-compressed Parquet file.
+        
+        While the file holds exactly the available reservoirs and is newer than
+        every reservoir CSV, loaders read from it instead of parsing the CSV files.
+        
+        Returns:
+            Path of the written cache file
+        """
+        if pa is None:
+            raise ImportError("build_cache requires pyarrow")
+        
+        data = self._load_raw_all()
+        frames = [df.assign(**{self.SOURCE_COLUMN: reservoir}) for reservoir, df in data.items()]
+        if not frames:
+            raise FileNotFoundError(f"No reservoir data files found in {self.data_path}")
+        
+        master = self._categorize(pd.concat(frames, ignore_index=True),
+                                  self.CATEGORICAL_COLUMNS + [self.SOURCE_COLUMN])
+        # Record the stored reservoirs so added or removed CSVs invalidate the cache
+        table = pa.Table.from_pandas(master, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[self.MASTER_RESERVOIRS_KEY] = json.dumps(sorted(data)).encode()
+        cache_path = self.data_path / self.MASTER_CACHE_FILE
+        pq.write_table(table.replace_schema_metadata(metadata), cache_path, compression='zstd')
+        self._master_fresh = None
+        return cache_path
+    
+    def _master_cache_is_fresh(self) -> bool:
+        """
+        Check whether the master Parquet cache can stand in for the CSV files.
+        
+        The cache is fresh when it stores exactly the available reservoirs and is
+        newer than each of their CSV files. The check runs once per loader.
+        """
+        if self._master_fresh is None:
+            self._master_fresh = self._check_master_cache()
+        return self._master_fresh
+    
+    def _check_master_cache(self) -> bool:
+        """Compare the master cache's reservoirs and mtime against the CSV files."""
+        if pa is None:
+            return False
+        cache_path = self.data_path / self.MASTER_CACHE_FILE
+        if not cache_path.exists():
+            return False
+        
+        metadata = pq.read_schema(cache_path).metadata or {}
+        stored = metadata.get(self.MASTER_RESERVOIRS_KEY)
+        if stored is None or json.loads(stored) != self.reservoirs:
+            return False
+        
+        cache_mtime = cache_path.stat().st_mtime
+        for reservoir in self.reservoirs:
+            file_path = self.data_path / f"{reservoir}.csv"
+            if not file_path.exists() or file_path.stat().st_mtime > cache_mtime:
+                return False
+        return True
+    
+    def _read_master(self, filters: Optional[list] = None) -> pd.DataFrame:
+        """Read rows from the master Parquet cache, without the source column."""
+        df = pd.read_parquet(self.data_path / self.MASTER_CACHE_FILE, engine='pyarrow', filters=filters)
+        return df.drop(columns=self.SOURCE_COLUMN)
+    
+    @staticmethod
+    def _categorize(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """Cast the given columns, where present, to categorical dtype in place."""
+        for col in columns:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        return df
+    
     def load_all_reservoirs(self) -> Dict[str, pd.DataFrame]:
         """
         Load data for all available reservoirs.
@@ -55,10 +206,27 @@ class ReservoirDataLoader:
         Returns:
             Dictionary mapping reservoir names to DataFrames
         """
+        return {reservoir: df.copy() for reservoir, df in self._load_raw_all().items()}
+    
+    def _load_raw_all(self) -> Dict[str, pd.DataFrame]:
+        """
+        Parse all reservoir files concurrently, in reservoir order.
+        
+        Parsing releases the GIL, so threads overlap file I/O and parsing.
+        The returned frames are the shared cached ones.
+        """
+        if not self.reservoirs:
+            return {}
+        
+        max_workers = min(len(self.reservoirs), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {reservoir: executor.submit(self._load_raw, reservoir)
+                       for reservoir in self.reservoirs}
+        
         data = {}
-        for reservoir in self.reservoirs:
+        for reservoir, future in futures.items():
             try:
-                data[reservoir] = self.load_single_reservoir(reservoir)
+                data[reservoir] = future.result()
             except FileNotFoundError as e:
                 print(f"Warning: {e}")
         return data
@@ -70,18 +238,23 @@ class ReservoirDataLoader:
         Returns:
             Combined DataFrame with all reservoir data
         """
-        all_data = []
-        for reservoir in self.reservoirs:
-            try:
-                df = self.load_single_reservoir(reservoir)
-                all_data.append(df)
-            except FileNotFoundError as e:
-                print(f"Warning: {e}")
+        if self._combined is not None:
+            return self._combined.copy()
         
-        if all_data:
-            return pd.concat(all_data, ignore_index=True)
+        if self._master_cache_is_fresh():
+            combined = self._read_master()
         else:
-            return pd.DataFrame()
+            all_data = list(self._load_raw_all().values())
+            
+            if not all_data:
+                return pd.DataFrame()
+            
+            # Categories differ per file, so concat falls back to object dtype
+            combined = self._categorize(pd.concat(all_data, ignore_index=True),
+                                        self.CATEGORICAL_COLUMNS)
+        
+        self._combined = combined
+        return combined.copy()
     
     def get_date_range(self, reservoir_name: Optional[str] = None) -> tuple:
         """
@@ -94,11 +267,20 @@ class ReservoirDataLoader:
             Tuple of (start_date, end_date)
         """
         if reservoir_name:
-            df = self.load_single_reservoir(reservoir_name)
+            df = self._load_raw(reservoir_name)
             return df['date'].min(), df['date'].max()
         else:
-            df = self.load_combined_data()
-            return df['date'].min(), df['date'].max()
+            # Read-only access, so the cached frames are used without copying
+            ranges = []
+            for reservoir in self.reservoirs:
+                try:
+                    df = self._load_raw(reservoir)
+                    ranges.append((df['date'].min(), df['date'].max()))
+                except FileNotFoundError as e:
+                    print(f"Warning: {e}")
+            if not ranges:
+                return pd.NaT, pd.NaT
+            return min(r[0] for r in ranges), max(r[1] for r in ranges)
     
     def get_reservoir_info(self) -> pd.DataFrame:
         """
@@ -110,7 +292,7 @@ class ReservoirDataLoader:
         info_data = []
         for reservoir in self.reservoirs:
             try:
-                df = self.load_single_reservoir(reservoir)
+                df = self._load_raw(reservoir)
                 info = {
                     'reservoir_name': reservoir,
                     'reservoir_code': df['embalse_codigo'].iloc[0],
@@ -2,10 +2,36 @@
 Data validation utilities for reservoir weather data.
 """
 
+import warnings
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; checks fall back to NumPy
+    njit = None
+
+try:
+    import numexpr as ne
+except ImportError:  # numexpr is optional; checks fall back to NumPy
+    ne = None
+
+
+def _extreme_change_kernel(codes: np.ndarray, values: np.ndarray, limit: float) -> np.ndarray:
+    """Positions where a value changes by more than limit from the previous row of its group."""
+    out = np.empty(values.size, np.int64)
+    n = 0
+    for i in range(1, values.size):
+        if codes[i] == codes[i - 1] and abs(values[i] - values[i - 1]) > limit:
+            out[n] = i
+            n += 1
+    return out[:n]
+
+
+if njit is not None:
+    _extreme_change_kernel = njit(cache=True)(_extreme_change_kernel)
+
 
 class DataValidator:
     """
@@ -23,12 +49,11 @@ class DataValidator:
         Returns:
             Dictionary with column names and completeness percentages
         """
-        completeness = {}
-        for col in df.columns:
-            non_null_count = df[col].notna().sum()
-            completeness[col] = (non_null_count / len(df)) * 100
+        # One reduction over the whole notna mask instead of a Series per column
+        non_null_counts = df.notna().to_numpy().sum(axis=0)
+        percentages = non_null_counts / len(df) * 100 if len(df) else np.full(len(df.columns), np.nan)
         
-        return completeness
+        return dict(zip(df.columns, percentages.tolist()))
     
     @staticmethod
     def check_temporal_consistency(df: pd.DataFrame) -> Dict[str, any]:
@@ -41,17 +66,40 @@ class DataValidator:
         Returns:
             Dictionary with temporal consistency metrics
         """
-        df_sorted = df.sort_values('date')
-        date_diffs = df_sorted['date'].diff()
+        # One sort of the raw date array provides every metric
+        dates = df['date'].dropna()
+        tz = dates.dt.tz
+        if tz is not None:
+            # Sort naive UTC times; the gaps are unchanged and the range is converted back
+            dates = dates.dt.tz_convert(None)
+        dates = np.sort(dates.to_numpy())
+        if dates.size == 0:
+            return {
+                'date_range': (pd.NaT, pd.NaT),
+                'total_days': 0,
+                'unique_dates': 0,
+                'duplicate_dates': len(df),
+                'missing_days': 0,
+                'median_gap_days': np.nan,
+                'max_gap_days': np.nan
+            }
+        
+        date_min, date_max = pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+        if tz is not None:
+            date_min = date_min.tz_localize('UTC').tz_convert(tz)
+            date_max = date_max.tz_localize('UTC').tz_convert(tz)
+        gaps = np.diff(dates)
+        gap_days = gaps.astype('timedelta64[D]').astype(np.int64)
+        unique_dates = 1 + int(np.count_nonzero(gaps))
         
         results = {
-            'date_range': (df['date'].min(), df['date'].max()),
-            'total_days': (df['date'].max() - df['date'].min()).days,
-            'unique_dates': df['date'].nunique(),
-            'duplicate_dates': len(df) - df['date'].nunique(),
+            'date_range': (date_min, date_max),
+            'total_days': (date_max - date_min).days,
+            'unique_dates': unique_dates,
+            'duplicate_dates': len(df) - unique_dates,
             'missing_days': 0,  # Will be calculated if needed
-            'median_gap_days': date_diffs.dt.days.median(),
-            'max_gap_days': date_diffs.dt.days.max()
+            'median_gap_days': float(np.median(gap_days)) if gap_days.size else np.nan,
+            'max_gap_days': float(gap_days.max()) if gap_days.size else np.nan
         }
         
         return results
@@ -68,39 +116,61 @@ class DataValidator:
             Dictionary with inconsistency indices for each validation rule
         """
         inconsistencies = {}
+        index = df.index.to_numpy()
+        columns = set(df.columns)
         
         # Temperature consistency: min <= mean <= max
-        if all(col in df.columns for col in ['meteo_temp_min', 'meteo_temp_media', 'meteo_temp_max']):
-            temp_inconsistent = df[
-                (df['meteo_temp_min'] > df['meteo_temp_media']) |
-                (df['meteo_temp_media'] > df['meteo_temp_max'])
-            ].index.tolist()
-            inconsistencies['temperature_order'] = temp_inconsistent
+        if {'meteo_temp_min', 'meteo_temp_media', 'meteo_temp_max'}.issubset(columns):
+            tmin = DataValidator._float_values(df, 'meteo_temp_min')
+            tmed = DataValidator._float_values(df, 'meteo_temp_media')
+            tmax = DataValidator._float_values(df, 'meteo_temp_max')
+            temp_inconsistent = DataValidator._out_of_order(tmin, tmed, tmax)
+            inconsistencies['temperature_order'] = DataValidator._labels_where(index, temp_inconsistent)
         
         # Humidity consistency: min <= mean <= max
-        if all(col in df.columns for col in ['meteo_humedad_min', 'meteo_humedad_media', 'meteo_humedad_max']):
-            humidity_inconsistent = df[
-                (df['meteo_humedad_min'] > df['meteo_humedad_media']) |
-                (df['meteo_humedad_media'] > df['meteo_humedad_max'])
-            ].index.tolist()
-            inconsistencies['humidity_order'] = humidity_inconsistent
+        if {'meteo_humedad_min', 'meteo_humedad_media', 'meteo_humedad_max'}.issubset(columns):
+            hmin = DataValidator._float_values(df, 'meteo_humedad_min')
+            hmed = DataValidator._float_values(df, 'meteo_humedad_media')
+            hmax = DataValidator._float_values(df, 'meteo_humedad_max')
+            humidity_inconsistent = DataValidator._out_of_order(hmin, hmed, hmax)
+            inconsistencies['humidity_order'] = DataValidator._labels_where(index, humidity_inconsistent)
         
         # Wind speed consistency: average <= max
-        if all(col in df.columns for col in ['meteo_vel_viento', 'meteo_vel_viento_max']):
-            wind_inconsistent = df[
-                df['meteo_vel_viento'] > df['meteo_vel_viento_max']
-            ].index.tolist()
-            inconsistencies['wind_speed_order'] = wind_inconsistent
+        if {'meteo_vel_viento', 'meteo_vel_viento_max'}.issubset(columns):
+            wind_inconsistent = np.greater(DataValidator._float_values(df, 'meteo_vel_viento'),
+                                           DataValidator._float_values(df, 'meteo_vel_viento_max'))
+            inconsistencies['wind_speed_order'] = DataValidator._labels_where(index, wind_inconsistent)
         
         return inconsistencies
     
     @staticmethod
-    def check_reservoir_consistency(df: pd.DataFrame) -> Dict[str, List[int]]:
+    def _labels_where(index: np.ndarray, mask: np.ndarray) -> List:
+        """Index labels where mask is True, skipping the fancy indexing when none are."""
+        return index[mask].tolist() if mask.any() else []
+    
+    @staticmethod
+    def _out_of_order(low: np.ndarray, mid: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """Mask of rows violating low <= mid <= high (NaN comparisons never violate)."""
+        if ne is not None:
+            # Evaluated in one fused pass without intermediate boolean arrays
+            return ne.evaluate('(low > mid) | (mid > high)')
+        return np.greater(low, mid) | np.greater(mid, high)
+    
+    @staticmethod
+    def _float_values(df: pd.DataFrame, col: str) -> np.ndarray:
+        """Get a column as a float64 array with missing values as NaN."""
+        return df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    @staticmethod
+    def check_reservoir_consistency(df: pd.DataFrame,
+                                    df_sorted: Optional[pd.DataFrame] = None) -> Dict[str, List[int]]:
         """
         Check reservoir data consistency.
         
         Args:
             df: Input DataFrame
+            df_sorted: df already sorted by ['embalse_codigo', 'date'], to reuse
+                an existing sort (sorted here if None)
             
         Returns:
             Dictionary with reservoir inconsistency indices
@@ -109,28 +179,54 @@ class DataValidator:
         
         # Check if percentage is consistent with absolute values (if we had capacity data)
         # For now, just check percentage is within reasonable bounds
-        percentage_issues = df[
-            (df['embalse_porcentaje'] < 0) | (df['embalse_porcentaje'] > 100)
-        ].index.tolist()
-        inconsistencies['percentage_out_of_bounds'] = percentage_issues
+        percentage = DataValidator._float_values(df, 'embalse_porcentaje')
+        inconsistencies['percentage_out_of_bounds'] = DataValidator._labels_where(
+            df.index.to_numpy(), (percentage < 0) | (percentage > 100)
+        )
         
         # Check for extreme jumps in reservoir levels (>20% in one day)
-        df_sorted = df.sort_values(['embalse_codigo', 'date'])
-        df_sorted['percentage_change'] = df_sorted.groupby('embalse_codigo')['embalse_porcentaje'].diff()
-        extreme_changes = df_sorted[
-            df_sorted['percentage_change'].abs() > 20
-        ].index.tolist()
+        if df_sorted is None:
+            df_sorted = DataValidator._sort_by_reservoir(df)
+        if 'embalse_codigo' in df_sorted.columns:
+            codes, _ = pd.factorize(df_sorted['embalse_codigo'])
+        else:
+            # Without reservoir codes the data is treated as a single reservoir
+            codes = np.zeros(len(df_sorted), dtype=np.int64)
+        
+        if njit is not None:
+            positions = _extreme_change_kernel(
+                codes, DataValidator._float_values(df_sorted, 'embalse_porcentaje'), 20.0
+            )
+            extreme_changes = df_sorted.index.to_numpy()[positions].tolist() if positions.size else []
+        else:
+            # Rows are contiguous per reservoir after the sort, so a shifted
+            # difference with the reservoir boundaries masked out is a grouped diff
+            pct = DataValidator._float_values(df_sorted, 'embalse_porcentaje')
+            change = np.full(pct.size, np.nan)
+            change[1:] = pct[1:] - pct[:-1]
+            change[1:][codes[1:] != codes[:-1]] = np.nan
+            with np.errstate(invalid='ignore'):
+                extreme = np.abs(change) > 20
+            extreme_changes = DataValidator._labels_where(df_sorted.index.to_numpy(), extreme)
         inconsistencies['extreme_percentage_changes'] = extreme_changes
         
         return inconsistencies
     
     @staticmethod
-    def generate_quality_report(df: pd.DataFrame) -> Dict[str, any]:
+    def _sort_by_reservoir(df: pd.DataFrame) -> pd.DataFrame:
+        """Sort by reservoir code and date (by date alone if there is no code column)."""
+        keys = ['embalse_codigo', 'date'] if 'embalse_codigo' in df.columns else ['date']
+        return df.sort_values(keys, kind='mergesort')
+    
+    @staticmethod
+    def generate_quality_report(df: pd.DataFrame, deep_memory: bool = False) -> Dict[str, any]:
         """
         Generate comprehensive data quality report.
         
         Args:
             df: Input DataFrame
+            deep_memory: Measure the memory of Python objects in object columns
+                (slow on large frames; categorical columns are exact either way)
             
         Returns:
             Dictionary with complete quality assessment
@@ -141,7 +237,7 @@ class DataValidator:
         report['basic_stats'] = {
             'total_records': len(df),
             'total_columns': len(df.columns),
-            'memory_usage_mb': df.memory_usage(deep=True).sum() / 1024**2
+            'memory_usage_mb': df.memory_usage(deep=deep_memory).sum() / 1024**2
         }
         
         # Data completeness
@@ -153,8 +249,9 @@ class DataValidator:
         # Weather consistency
         report['weather_inconsistencies'] = DataValidator.validate_weather_consistency(df)
         
-        # Reservoir consistency
-        report['reservoir_inconsistencies'] = DataValidator.check_reservoir_consistency(df)
+        # Reservoir consistency, sorting the frame a single time
+        df_sorted = DataValidator._sort_by_reservoir(df)
+        report['reservoir_inconsistencies'] = DataValidator.check_reservoir_consistency(df, df_sorted)
         
         # Outlier detection (simple IQR method)
         report['outliers'] = DataValidator._detect_outliers(df)
@@ -173,21 +270,22 @@ class DataValidator:
         Returns:
             Dictionary with outlier counts per column
         """
-        outliers = {}
-        numeric_columns = df.select_dtypes(include=[np.number]).columns
-        
-        for col in numeric_columns:
-            if col in df.columns:
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - threshold * IQR
-                upper_bound = Q3 + threshold * IQR
-                
-                outlier_count = ((df[col] < lower_bound) | (df[col] > upper_bound)).sum()
-                outliers[col] = outlier_count
-        
-        return outliers
+        numeric = df.select_dtypes(include=[np.number])
+        if numeric.shape[1] == 0 or len(numeric) == 0:
+            return {col: 0 for col in numeric.columns}
+        
+        # Both quartiles of every column from a single percentile call
+        values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN columns
+            Q1, Q3 = np.nanpercentile(values, [25, 75], axis=0)
+        IQR = Q3 - Q1
+        lower_bound = Q1 - threshold * IQR
+        upper_bound = Q3 + threshold * IQR
+        
+        with np.errstate(invalid='ignore'):  # NaN values and bounds never count
+            outlier_counts = np.count_nonzero((values < lower_bound) | (values > upper_bound), axis=0)
+        return dict(zip(numeric.columns, outlier_counts.tolist()))
     
     @staticmethod
     def print_quality_summary(report: Dict[str, any]) -> None:
@@ -8,6 +8,10 @@ import pandas as pd
 import numpy as np
 from typing import List, Optional, Tuple, Dict
 
+from analysis.exploratory import pearson_matrix
+from data_processing.cleaner import ReservoirDataCleaner
+from data_processing.columns import compute_date_part, with_categorical_names
+
 
 class ReservoirPlotter:
     """
@@ -27,6 +31,18 @@ class ReservoirPlotter:
         plt.rcParams['figure.figsize'] = (12, 8)
         plt.rcParams['font.size'] = 10
     
+    @staticmethod
+    def _with_date_parts(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Return df with int16 'month' and 'year' columns, reusing existing ones.
+        
+        Rows without a date get missing (nullable Int16) parts, so groupbys leave them out.
+        """
+        missing = [part for part in ('month', 'year') if part not in df.columns]
+        if not missing:
+            return df
+        return df.assign(**{part: compute_date_part(df['date'], part) for part in missing})
+    
     @staticmethod
     def plot_reservoir_levels(df: pd.DataFrame, 
                             reservoirs: Optional[List[str]] = None,
@@ -42,16 +58,23 @@ class ReservoirPlotter:
         Returns:
             Matplotlib figure object
         """
+        df = with_categorical_names(df)
+        
         fig, ax = plt.subplots(figsize=figsize)
         
         if reservoirs is None:
             reservoirs = df['embalse_nombre'].unique()
+            subset = df
+        else:
+            subset = df[df['embalse_nombre'].isin(reservoirs)]
         
+        # Partition once instead of scanning the frame for every reservoir
+        groups = dict(list(subset.groupby('embalse_nombre', sort=False, observed=True)))
         for reservoir in reservoirs:
-            reservoir_data = df[df['embalse_nombre'] == reservoir]
-            if not reservoir_data.empty:
-                ax.plot(reservoir_data['date'], 
-                       reservoir_data['embalse_porcentaje'],
+            reservoir_data = groups.get(reservoir)
+            if reservoir_data is not None and not reservoir_data.empty:
+                ax.plot(reservoir_data['date'].to_numpy(), 
+                       reservoir_data['embalse_porcentaje'].to_numpy(),
                        label=reservoir, linewidth=2, alpha=0.8)
         
         ax.set_xlabel('Date')
@@ -78,9 +101,7 @@ class ReservoirPlotter:
         Returns:
             Matplotlib figure object
         """
-        # Add month column if not present
-        if 'month' not in df.columns:
-            df['month'] = df['date'].dt.month
+        df = ReservoirPlotter._with_date_parts(with_categorical_names(df))
         
         fig, axes = plt.subplots(2, 2, figsize=figsize)
         axes = axes.ravel()
@@ -91,15 +112,15 @@ class ReservoirPlotter:
         axes[0].set_xlabel('Month')
         
         # Yearly trend
-        yearly_avg = df.groupby(df['date'].dt.year)[variable].mean()
-        axes[1].plot(yearly_avg.index, yearly_avg.values, marker='o')
+        yearly_avg = df.groupby('year')[variable].mean()
+        axes[1].plot(yearly_avg.index.to_numpy(), yearly_avg.to_numpy(), marker='o')
         axes[1].set_title(f'Yearly Average {variable}')
         axes[1].set_xlabel('Year')
         axes[1].grid(True, alpha=0.3)
         
         # Monthly average by reservoir
         if 'embalse_nombre' in df.columns:
-            monthly_by_reservoir = df.groupby(['embalse_nombre', 'month'])[variable].mean().unstack()
+            monthly_by_reservoir = df.groupby(['embalse_nombre', 'month'], observed=True)[variable].mean().unstack()
             sns.heatmap(monthly_by_reservoir, ax=axes[2], cmap='viridis', cbar_kws={'label': variable})
             axes[2].set_title(f'Monthly {variable} by Reservoir')
         
@@ -132,7 +153,14 @@ class ReservoirPlotter:
         # Filter existing columns
         weather_cols = [col for col in weather_cols if col in df.columns]
         
-        correlation_matrix = df[weather_cols].corr()
+        block = df[weather_cols]
+        if len(block) > 1 and not block.isna().to_numpy().any():
+            # Dense data: standardized in float64, then one float32 matrix product
+            correlation = pearson_matrix(block.to_numpy(dtype=np.float64))
+            correlation_matrix = pd.DataFrame(correlation, index=weather_cols, columns=weather_cols)
+        else:
+            # Pairwise NaN handling needs the pandas implementation
+            correlation_matrix = block.corr()
         
         fig, ax = plt.subplots(figsize=figsize)
         sns.heatmap(correlation_matrix, 
@@ -162,20 +190,21 @@ class ReservoirPlotter:
         Returns:
             Matplotlib figure object
         """
-        reservoir_data = df[df['embalse_nombre'] == reservoir_name].copy()
-        reservoir_data = reservoir_data.sort_values('date')
+        df = with_categorical_names(df)
+        
+        reservoir_data = df[df['embalse_nombre'] == reservoir_name].sort_values('date')
         
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=figsize, sharex=True)
         
         # Precipitation
-        ax1.bar(reservoir_data['date'], reservoir_data['meteo_precipitacion'], 
+        ax1.bar(reservoir_data['date'].to_numpy(), reservoir_data['meteo_precipitacion'].to_numpy(), 
                alpha=0.7, color='steelblue', width=1)
         ax1.set_ylabel('Precipitation (mm)')
         ax1.set_title(f'{reservoir_name} - Precipitation and Water Level')
         ax1.grid(True, alpha=0.3)
         
         # Reservoir level
-        ax2.plot(reservoir_data['date'], reservoir_data['embalse_porcentaje'], 
+        ax2.plot(reservoir_data['date'].to_numpy(), reservoir_data['embalse_porcentaje'].to_numpy(), 
                 color='darkgreen', linewidth=2)
         ax2.set_ylabel('Water Level (%)')
         ax2.set_xlabel('Date')
@@ -197,12 +226,19 @@ class ReservoirPlotter:
         Returns:
             Matplotlib figure object
         """
+        df = ReservoirPlotter._with_date_parts(df)
+        
         fig, axes = plt.subplots(2, 2, figsize=figsize)
         
         # Temperature range over time
-        axes[0, 0].fill_between(df['date'], df['meteo_temp_min'], df['meteo_temp_max'], 
+        # float32 is ample precision for plotting and halves the data moved
+        dates = df['date'].to_numpy()
+        temp_min = df['meteo_temp_min'].to_numpy(dtype=np.float32)
+        temp_max = df['meteo_temp_max'].to_numpy(dtype=np.float32)
+        temp_mean = df['meteo_temp_media'].to_numpy(dtype=np.float32)
+        axes[0, 0].fill_between(dates, temp_min, temp_max, 
                                alpha=0.3, label='Temperature Range')
-        axes[0, 0].plot(df['date'], df['meteo_temp_media'], color='red', 
+        axes[0, 0].plot(dates, temp_mean, color='red', 
                        linewidth=1, label='Average Temperature')
         axes[0, 0].set_title('Daily Temperature Range')
         axes[0, 0].set_ylabel('Temperature (°C)')
@@ -210,8 +246,8 @@ class ReservoirPlotter:
         axes[0, 0].grid(True, alpha=0.3)
         
         # Monthly temperature averages
-        monthly_temp = df.groupby(df['date'].dt.month)['meteo_temp_media'].mean()
-        axes[0, 1].plot(monthly_temp.index, monthly_temp.values, marker='o', linewidth=2)
+        monthly_temp = df.groupby('month')['meteo_temp_media'].mean()
+        axes[0, 1].plot(monthly_temp.index.to_numpy(), monthly_temp.to_numpy(), marker='o', linewidth=2)
         axes[0, 1].set_title('Average Monthly Temperature')
         axes[0, 1].set_xlabel('Month')
         axes[0, 1].set_ylabel('Temperature (°C)')
@@ -219,19 +255,14 @@ class ReservoirPlotter:
         
         # Temperature distribution by season
         if 'season' not in df.columns:
-            df['season'] = df['date'].dt.month.map({
-                12: 'Winter', 1: 'Winter', 2: 'Winter',
-                3: 'Spring', 4: 'Spring', 5: 'Spring',
-                6: 'Summer', 7: 'Summer', 8: 'Summer',
-                9: 'Autumn', 10: 'Autumn', 11: 'Autumn'
-            })
+            df['season'] = ReservoirDataCleaner.seasons_for_months(df['month'])
         
         sns.boxplot(data=df, x='season', y='meteo_temp_media', ax=axes[1, 0])
         axes[1, 0].set_title('Temperature Distribution by Season')
         
         # Yearly temperature trend
-        yearly_temp = df.groupby(df['date'].dt.year)['meteo_temp_media'].mean()
-        axes[1, 1].plot(yearly_temp.index, yearly_temp.values, marker='o', linewidth=2)
+        yearly_temp = df.groupby('year')['meteo_temp_media'].mean()
+        axes[1, 1].plot(yearly_temp.index.to_numpy(), yearly_temp.to_numpy(), marker='o', linewidth=2)
         axes[1, 1].set_title('Yearly Average Temperature Trend')
         axes[1, 1].set_xlabel('Year')
         axes[1, 1].set_ylabel('Temperature (°C)')
@@ -255,13 +286,15 @@ class ReservoirPlotter:
         Returns:
             Matplotlib figure object
         """
+        df = ReservoirPlotter._with_date_parts(with_categorical_names(df))
+        
         reservoirs = df['embalse_nombre'].unique()
         
         fig, axes = plt.subplots(2, 2, figsize=figsize)
         
         # Average values comparison
-        avg_values = df.groupby('embalse_nombre')[metric].mean().sort_values(ascending=False)
-        axes[0, 0].bar(range(len(avg_values)), avg_values.values)
+        avg_values = df.groupby('embalse_nombre', observed=True)[metric].mean().sort_values(ascending=False)
+        axes[0, 0].bar(np.arange(len(avg_values)), avg_values.to_numpy())
         axes[0, 0].set_xticks(range(len(avg_values)))
         axes[0, 0].set_xticklabels(avg_values.index, rotation=45, ha='right')
         axes[0, 0].set_title(f'Average {metric} by Reservoir')
@@ -273,9 +306,10 @@ class ReservoirPlotter:
         axes[0, 1].set_title(f'{metric} Distribution by Reservoir')
         
         # Time series comparison (subset for clarity)
-        for reservoir in reservoirs[:5]:  # Show only first 5 reservoirs
-            reservoir_data = df[df['embalse_nombre'] == reservoir]
-            axes[1, 0].plot(reservoir_data['date'], reservoir_data[metric], 
+        selected = reservoirs[:5]  # Show only first 5 reservoirs
+        subset = df[df['embalse_nombre'].isin(selected)]
+        for reservoir, reservoir_data in subset.groupby('embalse_nombre', sort=False, observed=True):
+            axes[1, 0].plot(reservoir_data['date'].to_numpy(), reservoir_data[metric].to_numpy(), 
                            label=reservoir, alpha=0.8, linewidth=1)
         axes[1, 0].set_title(f'{metric} Over Time (Selected Reservoirs)')
         axes[1, 0].set_xlabel('Date')
@@ -284,10 +318,7 @@ class ReservoirPlotter:
         axes[1, 0].grid(True, alpha=0.3)
         
         # Seasonal patterns
-        if 'month' not in df.columns:
-            df['month'] = df['date'].dt.month
-        
-        seasonal_data = df.groupby(['embalse_nombre', 'month'])[metric].mean().unstack()
+        seasonal_data = df.groupby(['embalse_nombre', 'month'], observed=True)[metric].mean().unstack()
         sns.heatmap(seasonal_data, ax=axes[1, 1], cmap='viridis', 
                    cbar_kws={'label': metric})
         axes[1, 1].set_title(f'Monthly {metric} by Reservoir')
@@ -0,0 +1,184 @@
+"""
+Unit tests for analysis utilities.
+"""
+
+import unittest
+import pandas as pd
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from analysis.exploratory import ExploratoryAnalyzer
+
+
+class TestExploratoryAnalyzer(unittest.TestCase):
+    """Test cases for ExploratoryAnalyzer class."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        rng = np.random.default_rng(0)
+        n = 60
+        self.sample_data = pd.DataFrame({
+            'date': pd.date_range('2020-01-01', periods=n),
+            'embalse_codigo': ['S19'] * 30 + ['S20'] * 30,
+            'embalse_nombre': ['CASASOLA'] * 30 + ['CONCEPCION'] * 30,
+            'embalse_porcentaje': np.round(rng.uniform(40, 80, n), 1),
+            'meteo_temp_media': rng.uniform(5, 25, n),
+            'meteo_precipitacion': rng.uniform(0, 10, n)
+        })
+    
+    @staticmethod
+    def _naive_mann_kendall_s(values):
+        """Reference O(n^2) Mann-Kendall S statistic."""
+        S = 0
+        for i in range(len(values) - 1):
+            for j in range(i + 1, len(values)):
+                S += np.sign(values[j] - values[i])
+        return int(S)
+    
+    def test_mann_kendall_s(self):
+        """Test both Mann-Kendall S code paths against the reference loop."""
+        rng = np.random.default_rng(1)
+        values = np.round(rng.normal(size=300), 1)  # Rounding introduces ties
+        expected = self._naive_mann_kendall_s(values)
+        
+        self.assertEqual(ExploratoryAnalyzer._mann_kendall_s(values), expected)
+        
+        original_max_n = ExploratoryAnalyzer.MK_PAIRWISE_MAX_N
+        ExploratoryAnalyzer.MK_PAIRWISE_MAX_N = 10
+        try:
+            self.assertEqual(ExploratoryAnalyzer._mann_kendall_s(values), expected)
+        finally:
+            ExploratoryAnalyzer.MK_PAIRWISE_MAX_N = original_max_n
+    
+    def test_trend_analysis_mann_kendall(self):
+        """Test Mann-Kendall trend detection on an increasing series."""
+        self.sample_data['embalse_porcentaje'] = np.arange(len(self.sample_data), dtype=float)
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        results = analyzer.trend_analysis('embalse_porcentaje', method='mann_kendall')
+        
+        n = len(self.sample_data)
+        self.assertEqual(results['S_statistic'], n * (n - 1) // 2)
+        self.assertEqual(results['trend'], 'increasing')
+    
+    def test_trend_analysis_missing_dates(self):
+        """Test linear trends ignore rows with missing dates."""
+        self.sample_data['embalse_porcentaje'] = 2.0 * np.arange(len(self.sample_data))
+        self.sample_data.loc[[0, 10], 'date'] = pd.NaT
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        results = analyzer.trend_analysis('embalse_porcentaje', method='linear')
+        
+        self.assertAlmostEqual(results['slope'], 2.0)
+        self.assertAlmostEqual(results['intercept'], 2.0)
+    
+    def test_trend_analysis_tz_aware(self):
+        """Test trends on timezone-aware dates match the naive result."""
+        self.sample_data['embalse_porcentaje'] = 2.0 * np.arange(len(self.sample_data))
+        expected = ExploratoryAnalyzer(self.sample_data).trend_analysis('embalse_porcentaje')
+        self.sample_data['date'] = self.sample_data['date'].dt.tz_localize('Europe/Madrid')
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        
+        results = analyzer.trend_analysis('embalse_porcentaje')
+        self.assertAlmostEqual(results['slope'], expected['slope'])
+        results = analyzer.trend_analysis('embalse_porcentaje', method='mann_kendall')
+        self.assertEqual(results['trend'], 'increasing')
+    
+    def test_reservoir_comparison(self):
+        """Test per-reservoir comparison statistics."""
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        comparison = analyzer.reservoir_comparison(['embalse_porcentaje', 'missing_column'])
+        
+        self.assertEqual(comparison['reservoir'].tolist(), ['CASASOLA', 'CONCEPCION'])
+        self.assertEqual(comparison.columns.tolist(), [
+            'reservoir', 'embalse_porcentaje_mean', 'embalse_porcentaje_std',
+            'embalse_porcentaje_min', 'embalse_porcentaje_max', 'embalse_porcentaje_count'
+        ])
+        casasola = self.sample_data.loc[self.sample_data['embalse_nombre'] == 'CASASOLA', 'embalse_porcentaje']
+        self.assertAlmostEqual(comparison['embalse_porcentaje_mean'].iloc[0], casasola.mean())
+        self.assertEqual(comparison['embalse_porcentaje_count'].iloc[0], 30)
+    
+    def test_temporal_patterns(self):
+        """Test temporal patterns match pandas groupby means."""
+        self.sample_data.loc[3:6, 'meteo_temp_media'] = np.nan
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        patterns = analyzer.temporal_patterns('meteo_temp_media')
+        
+        dates = self.sample_data['date'].dt
+        expected_dow = self.sample_data.groupby(dates.dayofweek)['meteo_temp_media'].mean()
+        expected_monthly = self.sample_data.groupby(dates.month)['meteo_temp_media'].mean()
+        np.testing.assert_allclose(patterns['day_of_week'].to_numpy(), expected_dow.to_numpy())
+        np.testing.assert_allclose(patterns['monthly'].to_numpy(), expected_monthly.to_numpy())
+        self.assertEqual(patterns['monthly'].index.tolist(), [1, 2])
+    
+    def test_temporal_patterns_missing_dates(self):
+        """Test temporal patterns skip rows with missing dates."""
+        self.sample_data.loc[[5, 40], 'date'] = pd.NaT
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        patterns = analyzer.temporal_patterns('meteo_temp_media')
+        
+        dates = self.sample_data['date'].dt
+        expected_dow = self.sample_data.groupby(dates.dayofweek)['meteo_temp_media'].mean()
+        expected_yearly = self.sample_data.groupby(dates.year)['meteo_temp_media'].mean()
+        np.testing.assert_allclose(patterns['day_of_week'].to_numpy(), expected_dow.to_numpy())
+        np.testing.assert_allclose(patterns['yearly'].to_numpy(), expected_yearly.to_numpy())
+        self.assertEqual(patterns['day_of_week'].index.tolist(), list(range(7)))
+    
+    def test_correlation_analysis(self):
+        """Test the Pearson correlation matrix matches pandas."""
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        variables = ['embalse_porcentaje', 'meteo_temp_media', 'meteo_precipitacion']
+        corr = analyzer.correlation_analysis(variables)
+        
+        expected = self.sample_data[variables].corr()
+        np.testing.assert_allclose(corr.to_numpy(), expected.to_numpy(), atol=1e-5)
+        self.assertEqual(corr.index.tolist(), variables)
+    
+    def test_correlation_analysis_offset_and_constant_columns(self):
+        """Test columns with a large offset or no spread match pandas."""
+        rng = np.random.default_rng(2)
+        noise = rng.normal(size=len(self.sample_data))
+        self.sample_data['big'] = 1e6 + 0.01 * noise
+        self.sample_data['bigy'] = self.sample_data['big'] + 0.001 * rng.normal(size=len(noise))
+        self.sample_data['flat'] = 0.1
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        variables = ['big', 'bigy', 'flat', 'meteo_temp_media']
+        corr = analyzer.correlation_analysis(variables)
+        
+        expected = self.sample_data[variables].corr()
+        np.testing.assert_allclose(corr.to_numpy(), expected.to_numpy(), atol=1e-5)
+        self.assertTrue(corr.loc['flat'].isna().all())
+    
+    def test_extreme_events_analysis(self):
+        """Test extreme event threshold and counts."""
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        results = analyzer.extreme_events_analysis('meteo_precipitacion', threshold_percentile=90)
+        
+        precipitation = self.sample_data['meteo_precipitacion']
+        self.assertAlmostEqual(results['threshold'], precipitation.quantile(0.9))
+        self.assertEqual(results['num_extreme_events'], 6)
+        self.assertEqual(results['monthly_extreme_counts'].sum(), 6)
+    
+    def test_missing_dates(self):
+        """Test rows with missing dates are left out of date-part groupings."""
+        self.sample_data.loc[[5, 40], 'date'] = pd.NaT
+        self.sample_data.loc[[5, 40], 'meteo_precipitacion'] = 100.0
+        analyzer = ExploratoryAnalyzer(self.sample_data)
+        
+        seasonal = analyzer.seasonal_analysis('meteo_precipitacion')
+        expected_monthly = self.sample_data.groupby(
+            self.sample_data['date'].dt.month
+        )['meteo_precipitacion'].mean()
+        np.testing.assert_allclose(seasonal['monthly']['mean'].to_numpy(), expected_monthly.to_numpy())
+        self.assertEqual(seasonal['seasonal']['count'].sum(), len(self.sample_data) - 2)
+        
+        results = analyzer.extreme_events_analysis('meteo_precipitacion', threshold_percentile=90)
+        self.assertEqual(results['num_extreme_events'], 6)
+        self.assertEqual(results['monthly_extreme_counts'].sum(), 4)
+        self.assertEqual(results['yearly_extreme_counts'].to_dict(), {2020: 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,11 @@ Unit tests for data processing utilities.
 """
 
 import unittest
+import contextlib
+import io
+import os
+import shutil
+import tempfile
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -11,6 +16,8 @@ import sys
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent / 'src'))
 
+from data_processing import loader as loader_module
+from data_processing import validator as validator_module
 from data_processing.loader import ReservoirDataLoader
 from data_processing.cleaner import ReservoirDataCleaner
 from data_processing.validator import DataValidator
@@ -41,6 +48,71 @@ class TestReservoirDataLoader(unittest.TestCase):
         self.assertIsInstance(reservoirs, list)
         self.assertIn('CASASOLA', reservoirs)
         self.assertNotIn('test', reservoirs)  # Should exclude test files
+    
+    def test_load_single_reservoir(self):
+        """Test loading a single reservoir with parsed dtypes."""
+        loader = ReservoirDataLoader("data/reservoir-weather")
+        df = loader.load_single_reservoir('CASASOLA')
+        
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['date']))
+        self.assertIsInstance(df['embalse_nombre'].dtype, pd.CategoricalDtype)
+        self.assertEqual(df['meteo_temp_max'].dtype, np.float64)
+        
+        # Modifying the returned frame must not affect later loads
+        df.loc[0, 'embalse_porcentaje'] = -1
+        reloaded = loader.load_single_reservoir('CASASOLA')
+        self.assertNotEqual(reloaded.loc[0, 'embalse_porcentaje'], -1)
+    
+    def test_load_combined_data_cached(self):
+        """Test that the combined data is cached and returned as a copy."""
+        loader = ReservoirDataLoader("data/reservoir-weather")
+        combined = loader.load_combined_data()
+        combined['extra'] = 1
+        
+        reloaded = loader.load_combined_data()
+        self.assertNotIn('extra', reloaded.columns)
+        self.assertEqual(len(reloaded), len(combined))
+        self.assertEqual(reloaded['embalse_nombre'].nunique(), len(loader.reservoirs))
+    
+    @unittest.skipIf(loader_module.pa is None, "pyarrow not installed")
+    def test_build_cache(self):
+        """Test that loaders read the master Parquet cache once built."""
+        data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, data_dir)
+        for name in ['CASASOLA', 'VINUELA']:
+            shutil.copy(Path("data/reservoir-weather") / f"{name}.csv", data_dir)
+        
+        expected = ReservoirDataLoader(data_dir).load_single_reservoir('VINUELA')
+        cache_path = ReservoirDataLoader(data_dir).build_cache()
+        self.assertTrue(cache_path.exists())
+        
+        loader = ReservoirDataLoader(data_dir)
+        self.assertTrue(loader._master_cache_is_fresh())
+        pd.testing.assert_frame_equal(loader.load_single_reservoir('VINUELA'), expected)
+        self.assertNotIn(ReservoirDataLoader.SOURCE_COLUMN, loader.load_combined_data().columns)
+    
+    @unittest.skipIf(loader_module.pa is None, "pyarrow not installed")
+    def test_build_cache_reservoir_set_changes(self):
+        """Test the master cache is stale once the set of reservoir CSVs changes."""
+        data_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, data_dir)
+        for name in ['CASASOLA', 'VINUELA']:
+            shutil.copy(Path("data/reservoir-weather") / f"{name}.csv", data_dir)
+        ReservoirDataLoader(data_dir).build_cache()
+        
+        # A CSV removed after the cache was built
+        (data_dir / 'VINUELA.csv').unlink()
+        loader = ReservoirDataLoader(data_dir)
+        self.assertFalse(loader._master_cache_is_fresh())
+        self.assertEqual(loader.load_combined_data()['embalse_nombre'].unique().tolist(), ['CASASOLA'])
+        
+        # A CSV added with an mtime older than the cache
+        ReservoirDataLoader(data_dir).build_cache()
+        shutil.copy2(Path("data/reservoir-weather") / "LIMONERO.csv", data_dir)
+        os.utime(data_dir / 'LIMONERO.csv', (0, 0))
+        loader = ReservoirDataLoader(data_dir)
+        self.assertFalse(loader._master_cache_is_fresh())
+        self.assertIn('LIMONERO', loader.load_combined_data()['embalse_nombre'].unique().tolist())
 
 
 class TestReservoirDataCleaner(unittest.TestCase):
@@ -50,6 +122,7 @@ class TestReservoirDataCleaner(unittest.TestCase):
         """Set up test fixtures."""
         self.sample_data = pd.DataFrame({
             'date': pd.date_range('2020-01-01', periods=5),
+            'embalse_codigo': ['S19'] * 5,
             'embalse_porcentaje': [45.0, 50.123456789, 55.0, np.nan, 60.0],
             'meteo_temp_max': [25.123456789, 30.0, 28.0, 26.0, 29.0],
             'meteo_temp_min': [15.0, 20.0, 18.0, 16.0, np.nan],
@@ -64,6 +137,23 @@ class TestReservoirDataCleaner(unittest.TestCase):
         self.assertEqual(cleaned['embalse_porcentaje'].iloc[1], 50.1)
         self.assertEqual(cleaned['meteo_temp_max'].iloc[0], 25.12)
     
+    def test_validate_ranges(self):
+        """Test per-column out-of-range warnings, ignoring NaNs and absent columns."""
+        df = pd.DataFrame({
+            'embalse_porcentaje': [50.0, 120.0, -5.0, np.nan],
+            'meteo_temp_max': [20.0, 60.0, np.nan, 25.0],
+            'meteo_precipitacion': [0.0, 1.0, 2.0, 3.0]
+        })
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            validated = ReservoirDataCleaner.validate_ranges(df)
+        
+        self.assertEqual(output.getvalue().splitlines(), [
+            "Warning: 2 values in embalse_porcentaje outside range [0, 100]",
+            "Warning: 1 values in meteo_temp_max outside range [-10, 50]"
+        ])
+        pd.testing.assert_frame_equal(validated, df)
+    
     def test_handle_missing_values(self):
         """Test missing value handling."""
         filled = ReservoirDataCleaner.handle_missing_values(
@@ -74,6 +164,46 @@ class TestReservoirDataCleaner(unittest.TestCase):
         self.assertFalse(filled['embalse_porcentaje'].isna().any())
         self.assertFalse(filled['meteo_temp_min'].isna().any())
     
+    def test_handle_missing_values_interpolate(self):
+        """Test time-based interpolation of missing values."""
+        filled = ReservoirDataCleaner.handle_missing_values(
+            self.sample_data, strategy='interpolate'
+        )
+        
+        # Interior gap is interpolated between its neighbours
+        self.assertAlmostEqual(filled['embalse_porcentaje'].iloc[3], 57.5)
+        self.assertEqual(filled.index.tolist(), self.sample_data.index.tolist())
+    
+    def test_handle_missing_values_interpolate_per_reservoir(self):
+        """Test interpolation does not mix reservoirs sharing the same dates."""
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2020-01-01', '2020-01-01', '2020-01-02',
+                                    '2020-01-02', '2020-01-03', '2020-01-03']),
+            'embalse_codigo': ['A', 'B', 'A', 'B', 'A', 'B'],
+            'embalse_porcentaje': [10.0, 100.0, np.nan, np.nan, 30.0, 300.0]
+        })
+        filled = ReservoirDataCleaner.handle_missing_values(df, strategy='interpolate')
+        
+        self.assertEqual(filled['embalse_porcentaje'].tolist(), [10.0, 100.0, 20.0, 200.0, 30.0, 300.0])
+        self.assertEqual(filled['embalse_codigo'].tolist(), df['embalse_codigo'].tolist())
+    
+    def test_handle_missing_values_interpolate_edge_cases(self):
+        """Test interpolation without numeric columns and with missing dates."""
+        names = pd.DataFrame({'date': pd.date_range('2020-01-01', periods=2), 'embalse_nombre': ['A', 'B']})
+        pd.testing.assert_frame_equal(
+            ReservoirDataCleaner.handle_missing_values(names, strategy='interpolate'), names
+        )
+        
+        df = self.sample_data.copy()
+        df.loc[4, 'date'] = pd.NaT
+        df.loc[4, 'meteo_temp_min'] = np.nan
+        filled = ReservoirDataCleaner.handle_missing_values(df, strategy='interpolate')
+        
+        # The gap is interpolated from dated rows; the undated row is left as is
+        self.assertAlmostEqual(filled['embalse_porcentaje'].iloc[3], 55.0)
+        self.assertTrue(np.isnan(filled['meteo_temp_min'].iloc[4]))
+        self.assertEqual(filled['embalse_porcentaje'].iloc[4], 60.0)
+    
     def test_add_derived_features(self):
         """Test derived feature creation."""
         enhanced = ReservoirDataCleaner.add_derived_features(self.sample_data)
@@ -83,6 +213,50 @@ class TestReservoirDataCleaner(unittest.TestCase):
         self.assertIn('month', enhanced.columns)
         self.assertIn('season', enhanced.columns)
         self.assertIn('meteo_temp_range', enhanced.columns)
+        
+        # Check that date parts are compact and season is categorical
+        self.assertEqual(enhanced['month'].dtype, np.int16)
+        self.assertEqual(enhanced['season'].tolist(), ['Winter'] * 5)
+        self.assertIsInstance(enhanced['season'].dtype, pd.CategoricalDtype)
+    
+    def test_add_derived_features_season_boundaries(self):
+        """Test season assignment at the month boundaries."""
+        df = pd.DataFrame({
+            'date': pd.to_datetime([f'2020-{m:02d}-15' for m in (2, 3, 5, 6, 8, 9, 11, 12)]),
+            'embalse_codigo': ['A'] * 8,
+            'embalse_porcentaje': [50.0] * 8
+        })
+        enhanced = ReservoirDataCleaner.add_derived_features(df)
+        
+        self.assertEqual(
+            enhanced['season'].tolist(),
+            ['Winter', 'Spring', 'Spring', 'Summer', 'Summer', 'Autumn', 'Autumn', 'Winter']
+        )
+    
+    def test_add_derived_features_missing_dates(self):
+        """Test date parts and season stay missing where the date is missing."""
+        self.sample_data.loc[2, 'date'] = pd.NaT
+        enhanced = ReservoirDataCleaner.add_derived_features(self.sample_data).sort_index()
+        
+        self.assertTrue(pd.isna(enhanced['month'].iloc[2]))
+        self.assertTrue(pd.isna(enhanced['season'].iloc[2]))
+        self.assertEqual(enhanced['month'].dropna().tolist(), [1, 1, 1, 1])
+        self.assertEqual(enhanced['season'].dropna().tolist(), ['Winter'] * 4)
+    
+    def test_add_derived_features_reservoir_change(self):
+        """Test reservoir changes do not cross reservoir boundaries."""
+        df = pd.DataFrame({
+            'date': list(pd.date_range('2020-01-01', periods=3)) * 2,
+            'embalse_codigo': ['S19'] * 3 + ['S20'] * 3,
+            'embalse_porcentaje': [10.0, 12.0, 15.0, 50.0, 49.0, 47.0]
+        })
+        enhanced = ReservoirDataCleaner.add_derived_features(df)
+        
+        np.testing.assert_array_equal(
+            enhanced['reservoir_change'].to_numpy(),
+            [np.nan, 2.0, 3.0, np.nan, -1.0, -2.0]
+        )
+        self.assertTrue(enhanced['reservoir_change_7d'].isna().all())
 
 
 class TestDataValidator(unittest.TestCase):
@@ -105,6 +279,32 @@ class TestDataValidator(unittest.TestCase):
         self.assertIsInstance(completeness, dict)
         self.assertEqual(completeness['date'], 100.0)
         self.assertEqual(completeness['embalse_porcentaje'], 100.0)
+        
+        # Fully populated columns are exactly 100 at any length
+        completeness = DataValidator.check_data_completeness(pd.DataFrame({'value': np.ones(11)}))
+        self.assertEqual(completeness['value'], 100.0)
+    
+    def test_check_temporal_consistency(self):
+        """Test temporal consistency metrics."""
+        df = self.sample_data.iloc[[4, 0, 1, 1]]  # Unsorted, with a duplicate date
+        results = DataValidator.check_temporal_consistency(df)
+        
+        self.assertEqual(results['date_range'], (pd.Timestamp('2020-01-01'), pd.Timestamp('2020-01-05')))
+        self.assertEqual(results['total_days'], 4)
+        self.assertEqual(results['unique_dates'], 3)
+        self.assertEqual(results['duplicate_dates'], 1)
+        self.assertEqual(results['max_gap_days'], 3)
+    
+    def test_check_temporal_consistency_tz_aware(self):
+        """Test temporal consistency metrics on timezone-aware dates."""
+        df = self.sample_data.iloc[[4, 0, 1, 1]].copy()
+        df['date'] = df['date'].dt.tz_localize('Europe/Madrid')
+        results = DataValidator.check_temporal_consistency(df)
+        
+        self.assertEqual(results['date_range'], (df['date'].min(), df['date'].max()))
+        self.assertEqual(str(results['date_range'][0].tz), 'Europe/Madrid')
+        self.assertEqual(results['unique_dates'], 3)
+        self.assertEqual(results['max_gap_days'], 3)
     
     def test_validate_weather_consistency(self):
         """Test weather data consistency validation."""
@@ -121,6 +321,48 @@ class TestDataValidator(unittest.TestCase):
         # Should detect percentage out of bounds (120%)
         self.assertIn('percentage_out_of_bounds', inconsistencies)
         self.assertIn(3, inconsistencies['percentage_out_of_bounds'])
+    
+    def test_check_reservoir_consistency_extreme_changes(self):
+        """Test extreme changes are found within, but not across, reservoirs."""
+        df = pd.DataFrame({
+            'date': pd.to_datetime(['2020-01-01', '2020-01-02', '2020-01-03'] * 2),
+            'embalse_codigo': ['A'] * 3 + ['B'] * 3,
+            # A jumps by 30 on its second day; B starts 60 above A's last value
+            'embalse_porcentaje': [10.0, 40.0, 30.0, 90.0, 85.0, 80.0]
+        }, index=[10, 11, 12, 20, 21, 22]).iloc[[5, 0, 3, 2, 4, 1]]
+        
+        inconsistencies = DataValidator.check_reservoir_consistency(df)
+        self.assertEqual(inconsistencies['extreme_percentage_changes'], [11])
+        
+        # Same result from the NumPy fallback used without numba
+        original_njit = validator_module.njit
+        validator_module.njit = None
+        try:
+            inconsistencies = DataValidator.check_reservoir_consistency(df)
+        finally:
+            validator_module.njit = original_njit
+        self.assertEqual(inconsistencies['extreme_percentage_changes'], [11])
+    
+    def test_detect_outliers(self):
+        """Test IQR outlier counts against a pandas quantile reference."""
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'dense': np.append(rng.normal(size=50), [8.0, -9.0]),
+            'with_nan': np.append(rng.normal(size=50), [np.nan, 12.0]),
+            'all_nan': np.full(52, np.nan),
+            'name': ['x'] * 52
+        })
+        df.loc[::7, 'with_nan'] = np.nan
+        outliers = DataValidator._detect_outliers(df)
+        
+        expected = {}
+        for col in ['dense', 'with_nan', 'all_nan']:
+            Q1, Q3 = df[col].quantile(0.25), df[col].quantile(0.75)
+            IQR = Q3 - Q1
+            expected[col] = int(((df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)).sum())
+        self.assertEqual(outliers, expected)
+        self.assertGreater(outliers['with_nan'], 0)
+        self.assertEqual(outliers['all_nan'], 0)
 
 
 if __name__ == '__main__':